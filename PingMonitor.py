@@ -22,10 +22,17 @@ import json
 import subprocess
 import time
 import threading
+import zlib
+import multiprocessing
+from multiprocessing import connection as mp_connection
 import tempfile
-from datetime import datetime
+import traceback
+import heapq
+from collections import deque
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from typing import Dict, Optional, Tuple, List
+from typing import Dict, Optional, Tuple, List, NamedTuple
 
 import requests
 
@@ -39,6 +46,7 @@ from PyQt6.QtWidgets import QMessageBox
 # !!! ЗАБЕРИ/СХОВАЙ свої токени перед пушем на GitHub
 TELEGRAM_TOKEN = "PUT_YOUR_TOKEN_HERE"
 CHAT_ID = "PUT_YOUR_CHAT_ID_HERE"
+TELEGRAM_API_URL = "https://api.telegram.org"
 
 CURRENT_VERSION = "1.0.3"
 UPDATE_JSON_URL = "https://raw.githubusercontent.com/AlchemicalFreak/PingMonitor/main/version.json"
@@ -89,6 +97,167 @@ def write_log(line: str):
     except Exception:
         pass
 
+# ---------------------------
+# Самодіагностика
+# ---------------------------
+class Histogram:
+    """HDR-подібна гістограма: лог-лінійні кошики, похибка значення < 1/2**sub_bits.
+
+    Значення множаться на scale і зберігаються цілими (мс * 1000 -> мкс).
+    """
+
+    def __init__(self, scale: float = 1000.0, sub_bits: int = 7):
+        self.scale = scale
+        self._bits = sub_bits
+        self._sub = 1 << sub_bits
+        self._half = self._sub >> 1
+        self._counts: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max = 0
+
+    def _index(self, v: int) -> int:
+        if v < self._sub:
+            return v
+        shift = v.bit_length() - self._bits
+        return self._sub + (shift - 1) * self._half + (v >> shift) - self._half
+
+    def _upper(self, idx: int) -> int:
+        if idx < self._sub:
+            return idx
+        k = idx - self._sub
+        shift = k // self._half + 1
+        top = k % self._half + self._half
+        return ((top + 1) << shift) - 1
+
+    def record(self, value: float):
+        v = max(0, int(value * self.scale))
+        idx = self._index(v)
+        with self._lock:
+            self._counts[idx] = self._counts.get(idx, 0) + 1
+            self.count += 1
+            self.total += v
+            if self.min is None or v < self.min:
+                self.min = v
+            if v > self.max:
+                self.max = v
+
+    def percentile(self, p: float) -> float:
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = max(1, int(round(self.count * p / 100.0)))
+            seen = 0
+            for idx in sorted(self._counts):
+                seen += self._counts[idx]
+                if seen >= target:
+                    return min(self._upper(idx), self.max) / self.scale
+            return self.max / self.scale
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "min": (self.min or 0) / self.scale,
+            "mean": (self.total / self.count / self.scale) if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max / self.scale,
+        }
+
+class Diagnostics:
+    """Лічильники та гістограми роботи самого PingMonitor (див. вікно «Діагностика»)."""
+
+    HISTOGRAMS = {
+        "probe_latency_ms": 1000.0,
+        "sweep_duration_ms": 1000.0,
+        "schedule_lag_ms": 1000.0,
+        "signal_queue_depth": 1.0,
+        "gui_update_ms": 1000.0,
+        "telegram_send_ms": 1000.0,
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, Histogram] = {n: Histogram(scale) for n, scale in self.HISTOGRAMS.items()}
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record(self, name: str, value: float):
+        self.histograms[name].record(value)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms = {n: Histogram(scale) for n, scale in self.HISTOGRAMS.items()}
+
+    def summary(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {"counters": counters, "histograms": {n: h.summary() for n, h in self.histograms.items()}}
+
+DIAG = Diagnostics()
+
+class SamplingProfiler:
+    """Семплюючий профайлер усіх потоків (sys._current_frames) з дампом у APP_DIR.
+
+    Результат у форматі collapsed stacks — відкривається flamegraph.pl або speedscope.
+    """
+
+    def __init__(self, interval_s: float = 0.005):
+        self.interval = interval_s
+        self._stacks: Dict[str, int] = {}
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self.samples = 0
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self):
+        if self._running:
+            return
+        self._stacks.clear()
+        self.samples = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="SamplingProfiler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        me = threading.get_ident()
+        while self._running:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = [f"{Path(fs.filename).name}:{fs.name}:{fs.lineno}" for fs in traceback.extract_stack(frame)]
+                key = ";".join([names.get(ident, f"thread-{ident}")] + stack)
+                self._stacks[key] = self._stacks.get(key, 0) + 1
+            self.samples += 1
+            time.sleep(self.interval)
+
+    def stop(self) -> Optional[Path]:
+        if not self._running:
+            return None
+        self._running = False
+        if self._thread:
+            self._thread.join(2)
+        out = APP_DIR / f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt"
+        try:
+            with open(out, "w", encoding="utf-8") as f:
+                for key, n in sorted(self._stacks.items(), key=lambda kv: -kv[1]):
+                    f.write(f"{key} {n}\n")
+        except Exception as e:
+            write_log(f"SamplingProfiler: помилка запису {out}: {e}")
+            return None
+        return out
+
 # ---------------------------
 # Конфіг load/save
 # ---------------------------
@@ -148,7 +317,8 @@ def send_telegram(text: str) -> bool:
     if not TELEGRAM_TOKEN or not CHAT_ID:
         write_log("Telegram: токен/чат не вказано")
         return False
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
+    url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_TOKEN}/sendMessage"
+    start = time.perf_counter()
     try:
         r = requests.post(url, data={
             "chat_id": CHAT_ID,
@@ -157,17 +327,34 @@ def send_telegram(text: str) -> bool:
             "disable_web_page_preview": True
         }, timeout=8)
         write_log(f"Telegram send status: {r.status_code}")
+        DIAG.count("telegram_sent" if r.status_code == 200 else "telegram_failed")
         return r.status_code == 200
     except Exception as e:
         write_log(f"Telegram send exception: {e}")
+        DIAG.count("telegram_failed")
         return False
+    finally:
+        DIAG.record("telegram_send_ms", (time.perf_counter() - start) * 1000)
+
+_telegram_lock = threading.Lock()
+_telegram_pending = 0
+
+def telegram_queue_depth() -> int:
+    return _telegram_pending
 
 def send_telegram_async(text: str):
+    global _telegram_pending
     def _t():
+        global _telegram_pending
         try:
             send_telegram(text)
         except Exception as e:
             write_log(f"send_telegram_async exception: {e}")
+        finally:
+            with _telegram_lock:
+                _telegram_pending -= 1
+    with _telegram_lock:
+        _telegram_pending += 1
     threading.Thread(target=_t, daemon=True).start()
 
 # ---------------------------
@@ -227,91 +414,1117 @@ def ping_host(addr: str, timeout_s: float = 1.0) -> Tuple[bool, Optional[int], O
 
     return False, None, None
 
+# ---------------------------
+# Реєстр хостів
+# ---------------------------
+STATE_NAMES = ("UNKNOWN", "ONLINE", "OFFLINE", "UNREACHABLE", "MAINTENANCE")
+
+class HostRecord:
+    """Стан одного хоста; поля змінюються лише під HostRegistry.lock."""
+    __slots__ = ("id", "ip", "group", "note", "parent", "up", "rtt", "probes", "failures",
+                 "last_probe", "last_change", "maintenance")
+
+    def __init__(self, hid: int, ip: str, group: str = "", note: str = "", parent: str = ""):
+        self.id = hid
+        self.ip = ip
+        self.group = group
+        self.note = note
+        self.parent = parent
+        self.up: Optional[bool] = None  # останній стан, від якого рахуються сповіщення
+        self.rtt: Optional[int] = None
+        self.probes = 0
+        self.failures = 0
+        self.last_probe = 0.0
+        self.last_change = 0.0
+        # None — звичайний режим; 0 — обслуговування без проб; N — проба раз на N проходів
+        self.maintenance: Optional[int] = None
+
+class HostView(NamedTuple):
+    id: int
+    ip: str
+    group: str
+    note: str
+    parent: str
+    state: str
+    rtt: Optional[int]
+    probes: int
+    failures: int
+    last_probe: float
+    last_change: float
+
+class HostRegistry:
+    """Єдине джерело стану хостів для MonitorThread, GUI та метрик.
+
+    Хост адресується цілим id (індекс у records); id не перевикористовуються,
+    тож запізнілий сигнал про видалений хост просто нікуди не потрапляє.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.records: List[Optional[HostRecord]] = []
+        self.by_ip: Dict[str, int] = {}
+        self.unreachable: set = set()  # id хостів за недоступним батьківським вузлом
+        self._topology: Optional[Topology] = None
+        self.maintenance = MaintenanceScheduler(self)
+
+    def sync(self, entries: List[Dict], windows: Optional[List[Dict]] = None):
+        """Узгоджує реєстр із cfg["entries"]: нові IP отримують id, видалені звільняються.
+
+        windows — загальні вікна обслуговування (cfg["maintenance"]).
+        """
+        with self.lock:
+            wanted: Dict[str, Dict] = {}
+            for e in entries:
+                ip = e.get("ip")
+                if ip and ip not in wanted:
+                    wanted[ip] = e
+            for ip in [ip for ip in self.by_ip if ip not in wanted]:
+                hid = self.by_ip.pop(ip)
+                self.records[hid] = None
+                self.unreachable.discard(hid)
+            for ip, e in wanted.items():
+                hid = self.by_ip.get(ip)
+                if hid is None:
+                    hid = len(self.records)
+                    self.records.append(HostRecord(hid, ip))
+                    self.by_ip[ip] = hid
+                rec = self.records[hid]
+                rec.group = e.get("group", "")
+                rec.note = e.get("note", "")
+                rec.parent = (e.get("parent") or "").strip()
+            self._topology = None
+            self.maintenance.load(windows or [], entries)
+
+    def id_of(self, ip: str) -> Optional[int]:
+        return self.by_ip.get(ip)
+
+    def topology(self) -> Topology:
+        with self.lock:
+            if self._topology is None:
+                self._topology = Topology(self.records, self.by_ip)
+            return self._topology
+
+    def reset_states(self):
+        with self.lock:
+            for rec in self.records:
+                if rec is not None:
+                    rec.up = None
+            self.unreachable.clear()
+
+    def record_probe(self, hid: int, ok: bool, rtt: Optional[int]) -> Tuple[Optional[str], Optional[bool], bool]:
+        """Зберігає результат проби; повертає (ip, попередній стан, обслуговування).
+
+        ip=None якщо хост видалено. Під час обслуговування стан для сповіщень не змінюється,
+        тож після вікна порівняння йде зі станом до нього.
+        """
+        with self.lock:
+            rec = self.records[hid]
+            if rec is None:
+                return None, None, False
+            prev = rec.up
+            now = time.time()
+            rec.rtt = rtt
+            rec.probes += 1
+            if not ok:
+                rec.failures += 1
+            rec.last_probe = now
+            if rec.maintenance is not None:
+                return rec.ip, prev, True
+            rec.up = ok
+            if prev is not ok:
+                rec.last_change = now
+            return rec.ip, prev, False
+
+    def set_unreachable(self, hid: int) -> bool:
+        with self.lock:
+            if hid in self.unreachable or self.records[hid] is None:
+                return False
+            self.unreachable.add(hid)
+            return True
+
+    def clear_unreachable(self, hid: int) -> bool:
+        with self.lock:
+            if hid not in self.unreachable:
+                return False
+            self.unreachable.discard(hid)
+            return True
+
+    def _state(self, rec: HostRecord) -> str:
+        if rec.id in self.unreachable:
+            return "UNREACHABLE"
+        if rec.maintenance is not None:
+            return "MAINTENANCE"
+        if rec.up is None:
+            return "UNKNOWN"
+        return "ONLINE" if rec.up else "OFFLINE"
+
+    def state_of(self, hid: int) -> Tuple[str, Optional[int]]:
+        with self.lock:
+            rec = self.records[hid]
+            if rec is None:
+                return "UNKNOWN", None
+            return self._state(rec), rec.rtt
+
+    def snapshot(self) -> List[HostView]:
+        with self.lock:
+            return [HostView(r.id, r.ip, r.group, r.note, r.parent, self._state(r), r.rtt,
+                             r.probes, r.failures, r.last_probe, r.last_change)
+                    for r in self.records if r is not None]
+
+# ---------------------------
+# Вікна обслуговування
+# ---------------------------
+WEEKDAYS = {
+    "mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6,
+    "пн": 0, "вт": 1, "ср": 2, "чт": 3, "пт": 4, "сб": 5, "нд": 6,
+}
+MAINTENANCE_SLOW_EVERY = 6
+
+def _parse_hhmm(value: str) -> int:
+    h, m = str(value).strip().split(":")
+    minutes = int(h) * 60 + int(m)
+    if not 0 <= minutes < 1440:
+        raise ValueError(f"час поза межами доби: {value}")
+    return minutes
+
+def _parse_days(value) -> set:
+    if value in (None, "", "daily", "щодня"):
+        return set(range(7))
+    if isinstance(value, str):
+        value = value.replace(" ", "").split(",")
+    days = set()
+    for d in value:
+        if isinstance(d, int):
+            days.add(d % 7)
+        elif "-" in d:
+            a, b = (WEEKDAYS[x.lower()] for x in d.split("-", 1))
+            days.update(range(a, b + 1) if a <= b else list(range(a, 7)) + list(range(0, b + 1)))
+        else:
+            days.add(WEEKDAYS[d.lower()])
+    return days
+
+def _as_list(value) -> list:
+    # "groups": "Камера" замість ["Камера"] — інакше цикл пішов би по символах рядка
+    if value is None:
+        return []
+    if isinstance(value, (str, dict)):
+        return [value]
+    return list(value)
+
+class MaintenanceWindow:
+    """Щотижневе вікно: дні тижня + початок/кінець (кінець <= початку — вікно через північ)."""
+    __slots__ = ("name", "days", "start", "duration", "every", "hosts", "active")
+
+    def __init__(self, spec: Dict, hosts: List[int]):
+        self.days = _parse_days(spec.get("days"))
+        self.start = _parse_hhmm(spec.get("start", "00:00"))
+        self.duration = (_parse_hhmm(spec.get("end", "00:00")) - self.start) % 1440 or 1440
+        mode = spec.get("mode", "pause")
+        if mode not in ("pause", "slow"):
+            raise ValueError(f"невідомий mode: {mode}")
+        self.every = 0 if mode == "pause" else max(1, int(spec.get("every", MAINTENANCE_SLOW_EVERY)))
+        self.name = spec.get("name") or f"{spec.get('start', '00:00')}-{spec.get('end', '00:00')}"
+        self.hosts = hosts
+        self.active = False
+
+    def evaluate(self, ts: float) -> Tuple[bool, float]:
+        """(чи активне вікно в момент ts, час наступного переходу)."""
+        now = datetime.fromtimestamp(ts)
+        midnight = datetime(now.year, now.month, now.day)
+        active_until: Optional[datetime] = None
+        next_start: Optional[datetime] = None
+        for offset in range(-1, 8):
+            day = midnight + timedelta(days=offset)
+            if day.weekday() not in self.days:
+                continue
+            begin = day + timedelta(minutes=self.start)
+            end = begin + timedelta(minutes=self.duration)
+            if begin <= now < end:
+                active_until = end if active_until is None else max(active_until, end)
+            elif begin > now and next_start is None:
+                next_start = begin
+        if active_until is not None:
+            return True, active_until.timestamp()
+        return False, next_start.timestamp() if next_start else float("inf")
+
+class MaintenanceScheduler:
+    """Вікна обслуговування для хостів реєстру.
+
+    Для кожного вікна наперед рахується час наступного переходу (купа heapq), тож
+    advance() між переходами — одне порівняння з next_due, а не перевірка всіх розкладів.
+    Викликається під HostRegistry.lock або сама його бере.
+    """
+
+    def __init__(self, registry: HostRegistry):
+        self.registry = registry
+        self.windows: List[MaintenanceWindow] = []
+        self._heap: List[Tuple[float, int]] = []
+        self._active_by_host: Dict[int, List[MaintenanceWindow]] = {}
+        self.paused: set = set()  # id хостів, які зараз не пінгуються
+        self.slow: Dict[int, int] = {}  # id -> пінгувати раз на N проходів
+        self.next_due = float("inf")
+
+    def load(self, windows: List[Dict], entries: List[Dict]):
+        reg = self.registry
+        with reg.lock:
+            for hid in list(self._active_by_host):
+                rec = reg.records[hid]
+                if rec is not None:
+                    rec.maintenance = None
+            self.windows, self._heap, self._active_by_host, self.paused, self.slow = [], [], {}, set(), {}
+
+            by_group: Dict[str, List[int]] = {}
+            for rec in reg.records:
+                if rec is not None:
+                    by_group.setdefault(rec.group, []).append(rec.id)
+            specs: List[Tuple[Dict, List[int]]] = []
+            for spec in windows:
+                hosts = [h for g in _as_list(spec.get("groups")) for h in by_group.get(g, [])]
+                hosts += [reg.by_ip[ip] for ip in _as_list(spec.get("hosts")) if ip in reg.by_ip]
+                specs.append((spec, sorted(set(hosts))))
+            for e in entries:
+                hid = reg.by_ip.get(e.get("ip"))
+                if hid is not None:
+                    specs.extend((spec, [hid]) for spec in _as_list(e.get("maintenance")))
+
+            # вікно батьківського вузла покриває всю його гілку: вимкнений на ніч комутатор
+            # не повинен давати окреме сповіщення від кожного хоста за ним
+            topo = reg.topology()
+            now = time.time()
+            for spec, hosts in specs:
+                covered = set(hosts)
+                for hid in hosts:
+                    if hid in topo:
+                        covered.update(topo.branch(hid))
+                try:
+                    w = MaintenanceWindow(spec, sorted(covered))
+                except Exception as e:
+                    write_log(f"Maintenance: некоректне вікно {spec}: {e}")
+                    continue
+                self.windows.append(w)
+                active, nxt = w.evaluate(now)
+                if active:
+                    self._apply(w, True)
+                heapq.heappush(self._heap, (nxt, len(self.windows) - 1))
+            self.next_due = self._heap[0][0] if self._heap else float("inf")
+
+    def _apply(self, w: MaintenanceWindow, active: bool) -> List[int]:
+        w.active = active
+        changed = []
+        for hid in w.hosts:
+            rec = self.registry.records[hid]
+            if rec is None:
+                continue
+            lst = self._active_by_host.setdefault(hid, [])
+            if active:
+                lst.append(w)
+            elif w in lst:
+                lst.remove(w)
+            if not lst:
+                del self._active_by_host[hid]
+                mode = None
+            else:
+                everies = [x.every for x in lst]
+                mode = 0 if 0 in everies else max(everies)
+            if mode == 0:
+                self.paused.add(hid)
+            else:
+                self.paused.discard(hid)
+            if mode:
+                self.slow[hid] = mode
+            else:
+                self.slow.pop(hid, None)
+            if mode != rec.maintenance:
+                rec.maintenance = mode
+                changed.append(hid)
+        return changed
+
+    def advance(self, now: Optional[float] = None) -> Tuple[List[int], List[str]]:
+        """Застосовує переходи, що настали; повертає (змінені id, повідомлення для журналу)."""
+        now = time.time() if now is None else now
+        if now < self.next_due:
+            return [], []
+        changed: List[int] = []
+        messages: List[str] = []
+        with self.registry.lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, idx = heapq.heappop(self._heap)
+                w = self.windows[idx]
+                active, nxt = w.evaluate(now)
+                if active != w.active:
+                    changed.extend(self._apply(w, active))
+                    messages.append(
+                        f"{'🌙 Початок' if active else '☀️ Кінець'} обслуговування «{w.name}»: {len(w.hosts)} вузлів")
+                heapq.heappush(self._heap, (nxt, idx))
+            self.next_due = self._heap[0][0] if self._heap else float("inf")
+        for m in messages:
+            write_log(m)
+        return changed, messages
+
+# ---------------------------
+# Топологія (батьківські вузли)
+# ---------------------------
+class Topology:
+    """Граф залежностей parent -> children над id з HostRegistry.
+
+    order — кожен хост один раз, батьки завжди раніше за дітей;
+    descendants — кількість вузлів, що стають недосяжними разом з вузлом.
+    """
+
+    def __init__(self, records: List[Optional[HostRecord]], by_ip: Dict[str, int]):
+        self.parent: Dict[int, int] = {}
+        self.children: Dict[int, List[int]] = {}
+        self.order: List[int] = []
+        self.descendants: Dict[int, int] = {}
+        self._build(records, by_ip)
+
+    def _build(self, records: List[Optional[HostRecord]], by_ip: Dict[str, int]):
+        live = [r for r in records if r is not None]
+        for r in live:
+            if not r.parent or r.parent == r.ip:
+                continue
+            pid = by_ip.get(r.parent)
+            if pid is None:
+                write_log(f"Topology: батьківський вузол {r.parent} для {r.ip} не знайдено, зв'язок ігнорується")
+                continue
+            self.parent[r.id] = pid
+            self.children.setdefault(pid, []).append(r.id)
+
+        # Kahn: у кожного вузла не більше одного батька, тож in-degree 0 або 1
+        pending = set(self.parent)
+        queue = deque(r.id for r in live if r.id not in pending)
+        while queue:
+            hid = queue.popleft()
+            self.order.append(hid)
+            for c in self.children.get(hid, []):
+                pending.discard(c)
+                queue.append(c)
+        if pending:
+            rest = [r.id for r in live if r.id in pending]
+            write_log(f"Topology: цикл залежностей, зв'язки скинуто для: {', '.join(records[h].ip for h in rest)}")
+            for hid in rest:
+                p = self.parent.pop(hid)
+                self.children[p].remove(hid)
+            self.order.extend(rest)
+
+        for hid in reversed(self.order):
+            self.descendants[hid] = sum(1 + self.descendants[c] for c in self.children.get(hid, []))
+
+        # DFS preorder: піддерево кожного вузла — суцільний зріз preorder
+        self.preorder: List[int] = []
+        self._pos: Dict[int, int] = {}
+        for root in self.order:
+            if root in self.parent:
+                continue
+            stack = [root]
+            while stack:
+                hid = stack.pop()
+                self._pos[hid] = len(self.preorder)
+                self.preorder.append(hid)
+                stack.extend(reversed(self.children.get(hid, [])))
+
+    def __contains__(self, hid: int) -> bool:
+        return hid in self._pos
+
+    def branch(self, hid: int) -> List[int]:
+        """Усі нащадки вузла (без нього самого), батьки раніше за дітей."""
+        pos = self._pos[hid]
+        return self.preorder[pos + 1:pos + 1 + self.descendants[hid]]
+
+    def is_blocked(self, hid: int, blocked: set, records: List[Optional[HostRecord]]) -> bool:
+        parent = self.parent.get(hid)
+        if parent is None:
+            return False
+        rec = records[parent]
+        return parent in blocked or (rec is not None and rec.up is False)
+
+# ---------------------------
+# Метрики / HTTP статус
+# ---------------------------
+def _om_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def render_status(hosts: List[Dict], sweep_s: float, sweeps: int, queues: Dict[str, int]) -> Tuple[bytes, bytes]:
+    """Повертає (JSON, OpenMetrics) для знімка стану; рахується один раз на прохід."""
+    status = {
+        "version": CURRENT_VERSION,
+        "generated": now_ts(),
+        "sweeps": sweeps,
+        "sweep_duration_s": round(sweep_s, 3),
+        "queues": queues,
+        "diagnostics": DIAG.summary(),
+        "hosts": hosts,
+    }
+    json_bytes = json.dumps(status, ensure_ascii=False).encode("utf-8")
+
+    up, unreachable, maintenance, rtt, probes, failures = [], [], [], [], [], []
+    for h in hosts:
+        labels = f'ip="{_om_label(h["ip"])}",group="{_om_label(h["group"])}"'
+        state = h["state"]
+        if state in ("ONLINE", "OFFLINE"):
+            up.append(f"pingmonitor_host_up{{{labels}}} {1 if state == 'ONLINE' else 0}")
+        unreachable.append(f"pingmonitor_host_unreachable{{{labels}}} {1 if state == 'UNREACHABLE' else 0}")
+        maintenance.append(f"pingmonitor_host_maintenance{{{labels}}} {1 if state == 'MAINTENANCE' else 0}")
+        if h["rtt_ms"] is not None:
+            rtt.append(f"pingmonitor_host_rtt_milliseconds{{{labels}}} {h['rtt_ms']}")
+        probes.append(f"pingmonitor_host_probes_total{{{labels}}} {h['probes']}")
+        failures.append(f"pingmonitor_host_probe_failures_total{{{labels}}} {h['failures']}")
+    lines = [
+        "# TYPE pingmonitor_host_up gauge",
+        "# HELP pingmonitor_host_up 1 if the last probe succeeded, 0 otherwise.",
+        *up,
+        "# TYPE pingmonitor_host_unreachable gauge",
+        "# HELP pingmonitor_host_unreachable 1 if the host is skipped because its parent is down.",
+        *unreachable,
+        "# TYPE pingmonitor_host_maintenance gauge",
+        "# HELP pingmonitor_host_maintenance 1 if the host is inside a maintenance window.",
+        *maintenance,
+        "# TYPE pingmonitor_host_rtt_milliseconds gauge",
+        "# UNIT pingmonitor_host_rtt_milliseconds milliseconds",
+        "# HELP pingmonitor_host_rtt_milliseconds Round-trip time of the last probe (absent if it failed).",
+        *rtt,
+        "# TYPE pingmonitor_host_probes counter",
+        "# HELP pingmonitor_host_probes Probes sent to the host.",
+        *probes,
+        "# TYPE pingmonitor_host_probe_failures counter",
+        "# HELP pingmonitor_host_probe_failures Failed probes.",
+        *failures,
+        "# TYPE pingmonitor_sweep_duration_seconds gauge",
+        "# UNIT pingmonitor_sweep_duration_seconds seconds",
+        "# HELP pingmonitor_sweep_duration_seconds Duration of the last full sweep.",
+        f"pingmonitor_sweep_duration_seconds {sweep_s:.6f}",
+        "# TYPE pingmonitor_sweeps counter",
+        "# HELP pingmonitor_sweeps Completed sweeps.",
+        f"pingmonitor_sweeps_total {sweeps}",
+        "# TYPE pingmonitor_queue_depth gauge",
+        "# HELP pingmonitor_queue_depth Pending items per internal queue.",
+        *[f'pingmonitor_queue_depth{{queue="{_om_label(q)}"}} {n}' for q, n in queues.items()],
+        "# EOF",
+    ]
+    return json_bytes, ("\n".join(lines) + "\n").encode("utf-8")
+
+class MetricsExporter:
+    """Вбудований HTTP-сервер: /metrics (OpenMetrics) та /status (JSON).
+
+    Відповіді беруться з готового знімка, який MonitorThread публікує після кожного проходу.
+    """
+    OPENMETRICS_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9108):
+        self.host = host
+        self.port = port
+        self._lock = threading.Lock()
+        self._json, self._metrics = render_status([], 0.0, 0, {})
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def publish(self, json_bytes: bytes, metrics_bytes: bytes):
+        with self._lock:
+            self._json, self._metrics = json_bytes, metrics_bytes
+
+    def current(self) -> Tuple[bytes, bytes]:
+        with self._lock:
+            return self._json, self._metrics
+
+    def start(self) -> bool:
+        exporter = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                json_bytes, metrics_bytes = exporter.current()
+                if path == "/metrics":
+                    body, ctype = metrics_bytes, MetricsExporter.OPENMETRICS_TYPE
+                elif path == "/status":
+                    body, ctype = json_bytes, "application/json; charset=utf-8"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+            self._server.daemon_threads = True
+        except Exception as e:
+            write_log(f"MetricsExporter: не вдалося відкрити {self.host}:{self.port}: {e}")
+            self._server = None
+            return False
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        write_log(f"MetricsExporter: http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
 # ---------------------------
 # MonitorThread
 # ---------------------------
 class MonitorThread(QtCore.QThread):
-    updated = QtCore.pyqtSignal(str, str, object)  # ip, state, rtt
+    updated = QtCore.pyqtSignal(int, str, object)  # host id, state, rtt
     log = QtCore.pyqtSignal(str)
 
-    def __init__(self, get_entries_callable, interval_sec: float = 5.0, timeout_s: float = 1.0):
+    def __init__(self, registry: HostRegistry, interval_sec: float = 5.0, timeout_s: float = 1.0,
+                 on_sweep=None, probe=None, probe_pause_s: float = 0.06):
         super().__init__()
-        self.get_entries = get_entries_callable
+        self.registry = registry
         self.interval = interval_sec
         self.timeout = timeout_s
+        self.on_sweep = on_sweep  # callable(json_bytes, metrics_bytes) після кожного проходу
+        self.probe = probe or ping_host  # callable(addr, timeout_s) -> (ok, rtt, used)
+        self.probe_pause = probe_pause_s  # пауза між хостами
         self._running = False
-        self.last_state: Dict[str, Optional[bool]] = {}
+        self.sweeps = 0
+        self.last_sweep_s = 0.0
+        # сигнали updated, ще не оброблені GUI-потоком
+        self._pending_lock = threading.Lock()
+        self.pending_updates = 0
+
+    def _emit_update(self, hid: int, state: str, rtt):
+        with self._pending_lock:
+            self.pending_updates += 1
+            depth = self.pending_updates
+        DIAG.record("signal_queue_depth", depth)
+        self.updated.emit(hid, state, rtt)
+
+    def ack_update(self):
+        with self._pending_lock:
+            self.pending_updates = max(0, self.pending_updates - 1)
+
+    def _advance_maintenance(self) -> bool:
+        changed, messages = self.registry.maintenance.advance()
+        for m in messages:
+            self.log.emit(m)
+        for hid in changed:
+            state, rtt = self.registry.state_of(hid)
+            self._emit_update(hid, state, rtt)
+        return bool(changed)
 
     def run(self):
         self._running = True
-        try:
-            entries = list(self.get_entries())
-            for e in entries:
-                ip = e.get("ip")
-                if ip:
-                    self.last_state[ip] = None
-        except Exception:
-            pass
+        self.registry.reset_states()
 
+        next_due: Optional[float] = None
         while self._running:
-            entries = list(self.get_entries())
-            if not entries:
+            topo = self.registry.topology()
+            if not topo.order:
                 for _ in range(int(self.interval * 10)):
                     if not self._running:
                         break
                     time.sleep(0.1)
                 continue
 
-            for e in entries:
+            records = self.registry.records
+            blocked: set = set()
+            sweep_start = time.perf_counter()
+            if next_due is not None:
+                DIAG.record("schedule_lag_ms", max(0.0, sweep_start - next_due) * 1000)
+            for hid in topo.order:
                 if not self._running:
                     break
-                ip = e.get("ip")
-                if not ip:
+                rec = records[hid]
+                if rec is None:
+                    continue
+                self._advance_maintenance()
+                if topo.is_blocked(hid, blocked, records):
+                    blocked.add(hid)
+                    if self.registry.set_unreachable(hid):
+                        self._emit_update(hid, "UNREACHABLE", None)
                     continue
+                self.registry.clear_unreachable(hid)
+                every = rec.maintenance
+                if every is not None and (every == 0 or self.sweeps % every):
+                    continue
+                probe_start = time.perf_counter()
                 try:
-                    ok, rtt, used = ping_host(ip, timeout_s=self.timeout)
+                    ok, rtt, used = self.probe(rec.ip, timeout_s=self.timeout)
                 except Exception as ex:
                     ok, rtt, used = False, None, None
-                    write_log(f"ping error for {ip}: {ex}")
-
-                prev = self.last_state.get(ip)
-                if prev is None:
-                    self.last_state[ip] = ok
-                    state = "ONLINE" if ok else "OFFLINE"
-                    self.updated.emit(ip, state, rtt)
-                elif prev != ok:
-                    self.last_state[ip] = ok
-                    state = "ONLINE" if ok else "OFFLINE"
-                    msg = (
-                        f"{'🟢' if ok else '🔴'} {ip} змінив статус:\n"
-                        f"Статус: {'ONLINE' if ok else 'OFFLINE'}\n"
-                        f"Час: {now_ts()}"
-                    )
-                    try:
-                        write_log(msg)
-                        self.log.emit(msg)
-                        send_telegram_async(msg)
-                    except Exception as ex:
-                        write_log(f"Error sending telegram on change: {ex}")
-                    self.updated.emit(ip, state, rtt)
-                else:
-                    state = "ONLINE" if ok else "OFFLINE"
-                    self.updated.emit(ip, state, rtt)
+                    write_log(f"ping error for {rec.ip}: {ex}")
+                DIAG.record("probe_latency_ms", (time.perf_counter() - probe_start) * 1000)
+                DIAG.count("probes")
+                if not ok:
+                    DIAG.count("probe_failures")
 
-                for _ in range(3):
+                self._handle_result(hid, ok, rtt, topo)
+
+                for _ in range(int(round(self.probe_pause / 0.02))):
                     if not self._running:
                         break
                     time.sleep(0.02)
 
+            if self._running:
+                self.sweeps += 1
+                self.last_sweep_s = time.perf_counter() - sweep_start
+                DIAG.record("sweep_duration_ms", self.last_sweep_s * 1000)
+                DIAG.count("sweeps")
+                self._publish()
+
+            next_due = time.perf_counter() + self.interval
             for _ in range(int(self.interval * 10)):
                 if not self._running:
                     break
                 time.sleep(0.1)
 
+    def _handle_result(self, hid: int, ok: bool, rtt: Optional[int], topo: Topology) -> Optional[bool]:
+        ip, prev, in_maintenance = self.registry.record_probe(hid, ok, rtt)
+        if ip is None:
+            return None
+        if in_maintenance:
+            self._emit_update(hid, "MAINTENANCE", rtt)
+            return prev
+        state = "ONLINE" if ok else "OFFLINE"
+        if prev is not None and prev != ok:
+            msg = (
+                f"{'🟢' if ok else '🔴'} {ip} змінив статус:\n"
+                f"Статус: {state}\n"
+                f"Час: {now_ts()}"
+            )
+            n = topo.descendants.get(hid, 0)
+            if n:
+                if ok:
+                    msg += f"\nГілку відновлено: {n} залежних вузлів знову перевіряються"
+                else:
+                    msg += f"\nГілка недоступна: {n} залежних вузлів (сповіщення для них приглушено)"
+            try:
+                write_log(msg)
+                self.log.emit(msg)
+                send_telegram_async(msg)
+            except Exception as ex:
+                write_log(f"Error sending telegram on change: {ex}")
+        self._emit_update(hid, state, rtt)
+        return prev
+
+    def _publish(self):
+        if self.on_sweep is None:
+            return
+        hosts = [{
+            "ip": h.ip,
+            "group": h.group,
+            "note": h.note,
+            "parent": h.parent,
+            "state": h.state,
+            "rtt_ms": h.rtt,
+            "probes": h.probes,
+            "failures": h.failures,
+        } for h in self.registry.snapshot()]
+        queues = {"gui_updates": self.pending_updates, "telegram": telegram_queue_depth()}
+        try:
+            self.on_sweep(*render_status(hosts, self.last_sweep_s, self.sweeps, queues))
+        except Exception as ex:
+            write_log(f"metrics publish error: {ex}")
+
     def stop(self):
         self._running = False
         self.wait(2000)
 
+# ---------------------------
+# Шардований моніторинг (кілька процесів)
+# ---------------------------
+SHARD_BATCH_SIZE = 256
+SHARD_BATCH_INTERVAL_S = 0.5
+SHARD_RESTART_DELAY_S = 1.0
+SHARD_MAX_START_FAILURES = 5  # поспіль невдалих запусків, після яких шард більше не перезапускається
+
+def shard_of(ip: str, shards: int) -> int:
+    return zlib.crc32(ip.encode("utf-8")) % shards
+
+def shard_worker(shard: int, conn, interval: float, timeout: float, probe_pause: float, probe=None):
+    """Цикл пінгу в окремому процесі.
+
+    Вхід: ("entries", [(id, ip)...]), ("skip", {id...}), ("slow", {id: every}), ("stop", None).
+    Вихід: ("batch", [(id, ok, rtt, probe_ms), ...]) та ("sweep", тривалість_с) в кінці проходу.
+    Хост зі slow пінгується лише в проходи з sweep_no % every == 0, як у MonitorThread.run.
+    """
+    probe = probe or ping_host
+    hosts: List[Tuple[int, str]] = []
+    skip: set = set()
+    slow: Dict[int, int] = {}
+    sweep_no = 0
+    running = True
+
+    def handle(wait_s: float):
+        nonlocal hosts, skip, slow, running
+        if not conn.poll(wait_s):
+            return
+        while True:
+            kind, payload = conn.recv()
+            if kind == "entries":
+                hosts = payload
+            elif kind == "skip":
+                skip = payload
+            elif kind == "slow":
+                slow = payload
+            elif kind == "stop":
+                running = False
+            if not conn.poll():
+                break
+
+    try:
+        while running:
+            handle(0)
+            if not hosts:
+                handle(0.2)
+                continue
+            start = time.perf_counter()
+            last_send = start
+            batch = []
+            for hid, ip in hosts:
+                if not running:
+                    break
+                if hid in skip:
+                    continue
+                every = slow.get(hid)
+                if every and sweep_no % every:
+                    continue
+                t0 = time.perf_counter()
+                try:
+                    ok, rtt, used = probe(ip, timeout_s=timeout)
+                except Exception as ex:
+                    ok, rtt = False, None
+                    write_log(f"shard {shard}: ping error for {ip}: {ex}")
+                now = time.perf_counter()
+                batch.append((hid, ok, rtt, (now - t0) * 1000))
+                if len(batch) >= SHARD_BATCH_SIZE or now - last_send >= SHARD_BATCH_INTERVAL_S:
+                    conn.send(("batch", batch))
+                    batch = []
+                    last_send = now
+                    handle(0)
+                if probe_pause:
+                    time.sleep(probe_pause)
+            if batch:
+                conn.send(("batch", batch))
+            if not running:
+                break
+            sweep_no += 1
+            conn.send(("sweep", time.perf_counter() - start))
+            deadline = time.perf_counter() + interval
+            while running:
+                left = deadline - time.perf_counter()
+                if left <= 0:
+                    break
+                handle(min(0.1, left))
+    except (EOFError, OSError, KeyboardInterrupt):
+        pass
+
+class ShardedMonitorThread(MonitorThread):
+    """Координатор: записи розподіляються між N процесами за crc32(IP кореня гілки) % N.
+
+    Воркери пінгують свою частку й шлють пакети результатів через Pipe; стан, сповіщення
+    та сигнали GUI залишаються в цьому потоці. Впалий воркер перезапускається.
+    """
+
+    def __init__(self, registry: HostRegistry, workers: int = 2, **kwargs):
+        super().__init__(registry, **kwargs)
+        self.workers = max(1, workers)
+        # spawn на всіх платформах: fork з QThread при живих потоках HTTP/Telegram/Qt може
+        # заблокуватися, а Windows однаково вміє лише spawn
+        self._mp = multiprocessing.get_context("spawn")
+        self._procs: List[Optional[multiprocessing.Process]] = [None] * self.workers
+        self._conns: List[Optional[mp_connection.Connection]] = [None] * self.workers
+        self._shard_hosts: List[List[Tuple[int, str]]] = [[] for _ in range(self.workers)]
+        self._shard_of: Dict[int, int] = {}
+        self._shard_skip: List[set] = [set() for _ in range(self.workers)]
+        self._shard_slow: List[Dict[int, int]] = [{} for _ in range(self.workers)]
+        self._shard_sweeps = [0] * self.workers
+        self._shard_sweep_s = [0.0] * self.workers
+        self._restart_at = [0.0] * self.workers
+        self._start_failures = [0] * self.workers
+        self._skip_dirty = False
+        self.restarts = 0
+
+    def _start_worker(self, i: int):
+        parent_conn, child_conn = self._mp.Pipe()
+        probe = None if self.probe is ping_host else self.probe
+        proc = self._mp.Process(
+            target=shard_worker, name=f"PingMonitor-shard-{i}", daemon=True,
+            args=(i, child_conn, self.interval, self.timeout, self.probe_pause, probe))
+        try:
+            proc.start()
+        except Exception as e:
+            parent_conn.close()
+            child_conn.close()
+            self._procs[i] = None
+            self._conns[i] = None
+            self._start_failures[i] += 1
+            msg = f"Воркер {i}: не вдалося запустити процес: {e}"
+            if self._start_failures[i] >= SHARD_MAX_START_FAILURES:
+                self._restart_at[i] = float("inf")
+                msg += f" — після {self._start_failures[i]} спроб шард вимкнено ({len(self._shard_hosts[i])} хостів не пінгуються)"
+            write_log(msg)
+            self.log.emit(msg)
+            return
+        self._start_failures[i] = 0
+        child_conn.close()
+        self._procs[i] = proc
+        self._conns[i] = parent_conn
+        try:
+            parent_conn.send(("entries", self._shard_hosts[i]))
+            parent_conn.send(("skip", set(self._shard_skip[i])))
+            parent_conn.send(("slow", dict(self._shard_slow[i])))
+        except (EOFError, OSError):
+            self._worker_failed(i)
+
+    def _worker_failed(self, i: int):
+        conn, proc = self._conns[i], self._procs[i]
+        self._conns[i] = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+        if proc is not None and proc.is_alive():
+            proc.terminate()
+
+    def _check_workers(self):
+        now = time.monotonic()
+        for i, proc in enumerate(self._procs):
+            if self._conns[i] is not None and proc is not None and proc.is_alive():
+                continue
+            if now < self._restart_at[i]:
+                continue
+            exitcode = proc.exitcode if proc is not None else None
+            self._worker_failed(i)
+            if proc is None:
+                msg = f"Воркер {i}: повторна спроба запуску"
+            else:
+                msg = f"Воркер {i} зупинився (код {exitcode}), перезапуск"
+            write_log(msg)
+            self.log.emit(msg)
+            DIAG.count("worker_restarts")
+            self.restarts += 1
+            self._restart_at[i] = now + SHARD_RESTART_DELAY_S
+            self._start_worker(i)
+
+    def _send(self, i: int, msg):
+        conn = self._conns[i]
+        if conn is None:
+            return
+        try:
+            conn.send(msg)
+        except (EOFError, OSError):
+            self._worker_failed(i)
+
+    def _distribute(self, topo: Topology):
+        # шард визначає корінь гілки: уся гілка в одному воркері й пінгується батьком вперед,
+        # тож результат батька завжди приходить раніше за результати дітей
+        records = self.registry.records
+        shards: List[List[Tuple[int, str]]] = [[] for _ in range(self.workers)]
+        self._shard_of = {}
+        for hid in topo.order:
+            rec = records[hid]
+            if rec is None:
+                continue
+            parent = topo.parent.get(hid)
+            if parent is None:
+                i = shard_of(rec.ip, self.workers)
+            else:
+                i = self._shard_of[parent]
+            self._shard_of[hid] = i
+            shards[i].append((hid, rec.ip))
+        for i, hosts in enumerate(shards):
+            if hosts != self._shard_hosts[i]:
+                self._shard_hosts[i] = hosts
+                self._send(i, ("entries", hosts))
+        self._skip_dirty = True
+
+    def _sync_skip(self):
+        if not self._skip_dirty:
+            return
+        self._skip_dirty = False
+        shards: List[set] = [set() for _ in range(self.workers)]
+        slow_shards: List[Dict[int, int]] = [{} for _ in range(self.workers)]
+        with self.registry.lock:
+            skipped = list(self.registry.unreachable | self.registry.maintenance.paused)
+            slow = list(self.registry.maintenance.slow.items())
+        for hid in skipped:
+            i = self._shard_of.get(hid)
+            if i is not None:
+                shards[i].add(hid)
+        for hid, every in slow:
+            i = self._shard_of.get(hid)
+            if i is not None:
+                slow_shards[i][hid] = every
+        for i, skip in enumerate(shards):
+            if skip != self._shard_skip[i]:
+                self._shard_skip[i] = skip
+                self._send(i, ("skip", skip))
+            if slow_shards[i] != self._shard_slow[i]:
+                self._shard_slow[i] = slow_shards[i]
+                self._send(i, ("slow", slow_shards[i]))
+
+    def _apply_batch(self, batch, topo: Topology):
+        records = self.registry.records
+        unreachable = self.registry.unreachable
+        for hid, ok, rtt, probe_ms in batch:
+            DIAG.record("probe_latency_ms", probe_ms)
+            DIAG.count("probes")
+            if not ok:
+                DIAG.count("probe_failures")
+            rec = records[hid] if hid in topo else None
+            if rec is None or hid in unreachable:
+                continue
+            if topo.is_blocked(hid, unreachable, records):
+                self._mark_unreachable([hid])
+                continue
+            if rec.maintenance is not None:
+                self._handle_result(hid, ok, rtt, topo)
+                continue
+            prev = self._handle_result(hid, ok, rtt, topo)
+            if topo.descendants.get(hid) and prev is not ok:
+                if ok:
+                    self._release_branch(hid, topo)
+                else:
+                    self._mark_unreachable(topo.branch(hid))
+
+    def _mark_unreachable(self, hids: List[int]):
+        for hid in hids:
+            if self.registry.set_unreachable(hid):
+                self._emit_update(hid, "UNREACHABLE", None)
+                self._skip_dirty = True
+
+    def _release_branch(self, hid: int, topo: Topology):
+        records = self.registry.records
+        blocked: set = set()
+        for child in topo.branch(hid):
+            if topo.is_blocked(child, blocked, records):
+                blocked.add(child)
+            elif self.registry.clear_unreachable(child):
+                self._skip_dirty = True
+
+    def _shard_done(self, i: int, sweep_s: float):
+        self._shard_sweeps[i] += 1
+        self._shard_sweep_s[i] = sweep_s
+        # шард, який так і не вдалося запустити, не тримає лічильник проходів
+        active = [j for j in range(self.workers) if self._shard_hosts[j] and self._restart_at[j] != float("inf")]
+        done = min(self._shard_sweeps[j] for j in active) if active else 0
+        if done > self.sweeps:
+            self.sweeps = done
+            self.last_sweep_s = max(self._shard_sweep_s[j] for j in active)
+            DIAG.record("sweep_duration_ms", self.last_sweep_s * 1000)
+            DIAG.count("sweeps")
+            self._publish()
+
+    def run(self):
+        self._running = True
+        self.registry.reset_states()
+        topo = self.registry.topology()
+        self._distribute(topo)
+        self._sync_skip()  # воркери отримають skip/slow разом із записами, ще до першого проходу
+        for i in range(self.workers):
+            self._start_worker(i)
+
+        next_check = 0.0
+        try:
+            while self._running:
+                now = time.monotonic()
+                if now >= next_check:
+                    next_check = now + 1.0
+                    if self.registry.topology() is not topo:
+                        topo = self.registry.topology()
+                        self._distribute(topo)
+                    self._check_workers()
+                if self._advance_maintenance():
+                    self._skip_dirty = True
+
+                conns = [c for c in self._conns if c is not None]
+                for conn in mp_connection.wait(conns, timeout=0.2) if conns else []:
+                    i = self._conns.index(conn)
+                    try:
+                        while conn.poll():
+                            kind, payload = conn.recv()
+                            if kind == "batch":
+                                self._apply_batch(payload, topo)
+                            elif kind == "sweep":
+                                self._shard_done(i, payload)
+                    except (EOFError, OSError):
+                        self._worker_failed(i)
+                if not conns:
+                    time.sleep(0.2)
+                self._sync_skip()
+        finally:
+            self._stop_workers()
+
+    def _stop_workers(self):
+        for i in range(self.workers):
+            self._send(i, ("stop", None))
+        deadline = time.monotonic() + 3.0
+        for i, proc in enumerate(self._procs):
+            if proc is None:
+                continue
+            proc.join(max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                proc.terminate()
+                proc.join(1.0)
+            self._worker_failed(i)
+            self._procs[i] = None
+
+    def stop(self):
+        self._running = False
+        self.wait(6000)
+
+# ---------------------------
+# Групи (агрегати)
+# ---------------------------
+class GroupStats:
+    """Лічильники станів рядків однієї групи.
+
+    Оновлюються на кожному переході стану (move), таблиця не перераховується.
+    Найгірший пінг (лише ONLINE-хостів) рахується ліниво: повний прохід по групі
+    лише тоді, коли покращився або зник саме той хост, що був найгіршим.
+    """
+    __slots__ = ("counts", "rtt", "_worst", "_worst_hid", "_worst_dirty")
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {name: 0 for name in STATE_NAMES}
+        self.rtt: Dict[int, int] = {}
+        self._worst: Optional[int] = None
+        self._worst_hid: Optional[int] = None
+        self._worst_dirty = False
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def add(self, hid: int, state: str, rtt: Optional[int]):
+        self.counts[state] += 1
+        self._set_rtt(hid, rtt if state == "ONLINE" else None)
+
+    def move(self, hid: int, old: str, new: str, rtt: Optional[int]):
+        if old != new:
+            self.counts[old] -= 1
+            self.counts[new] += 1
+        self._set_rtt(hid, rtt if new == "ONLINE" else None)
+
+    def _set_rtt(self, hid: int, rtt: Optional[int]):
+        if rtt is None:
+            self.rtt.pop(hid, None)
+        else:
+            self.rtt[hid] = rtt
+        if self._worst_dirty:
+            return  # максимум однаково перерахується при читанні
+        if rtt is not None and (self._worst is None or rtt >= self._worst):
+            self._worst, self._worst_hid = rtt, hid
+        elif hid == self._worst_hid:
+            self._worst_dirty = True
+
+    def worst_rtt(self) -> Optional[int]:
+        if self._worst_dirty:
+            self._worst_dirty = False
+            if self.rtt:
+                self._worst_hid, self._worst = max(self.rtt.items(), key=lambda kv: kv[1])
+            else:
+                self._worst_hid, self._worst = None, None
+        return self._worst
+
 # ---------------------------
 # Helpers: Icon Button (round)
 # ---------------------------
@@ -329,6 +1542,84 @@ class IconButton(QtWidgets.QToolButton):
         if tooltip:
             self.setToolTip(tooltip)
 
+# ---------------------------
+# Діагностика (вікно)
+# ---------------------------
+class DiagnosticsDialog(QtWidgets.QDialog):
+    LABELS = {
+        "probe_latency_ms": "Пінг (subprocess), мс",
+        "sweep_duration_ms": "Прохід, мс",
+        "schedule_lag_ms": "Відставання від розкладу, мс",
+        "signal_queue_depth": "Черга сигналів GUI",
+        "gui_update_ms": "Оновлення рядка GUI, мс",
+        "telegram_send_ms": "Надсилання Telegram, мс",
+    }
+
+    def __init__(self, profiler: SamplingProfiler, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Діагностика PingMonitor")
+        self.resize(820, 380)
+        self.profiler = profiler
+
+        v = QtWidgets.QVBoxLayout(self)
+        self.table = QtWidgets.QTableWidget(len(self.LABELS), 7)
+        self.table.setHorizontalHeaderLabels(["Метрика", "К-сть", "mean", "p50", "p90", "p99", "max"])
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setColumnWidth(0, 260)
+        v.addWidget(self.table, 1)
+
+        self.label_counters = QtWidgets.QLabel()
+        self.label_counters.setWordWrap(True)
+        v.addWidget(self.label_counters)
+
+        row = QtWidgets.QHBoxLayout()
+        self.btn_profile = QtWidgets.QPushButton()
+        self.btn_profile.clicked.connect(self.toggle_profile)
+        self.btn_reset = QtWidgets.QPushButton("Скинути")
+        self.btn_reset.clicked.connect(self.on_reset)
+        row.addWidget(self.btn_profile)
+        row.addWidget(self.btn_reset)
+        row.addStretch()
+        v.addLayout(row)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+        self.refresh()
+
+    def refresh(self):
+        data = DIAG.summary()
+        for r, (name, label) in enumerate(self.LABELS.items()):
+            h = data["histograms"][name]
+            values = [label, str(h["count"])] + [f"{h[k]:.1f}" for k in ("mean", "p50", "p90", "p99", "max")]
+            for c, text in enumerate(values):
+                item = self.table.item(r, c)
+                if item is None:
+                    item = QtWidgets.QTableWidgetItem()
+                    self.table.setItem(r, c, item)
+                item.setText(text)
+        counters = data["counters"]
+        self.label_counters.setText(", ".join(f"{k}: {counters[k]}" for k in sorted(counters)) or "Лічильники порожні")
+        if self.profiler.running:
+            self.btn_profile.setText(f"Зупинити профілювання ({self.profiler.samples} семплів)")
+        else:
+            self.btn_profile.setText("Почати профілювання")
+
+    def toggle_profile(self):
+        if self.profiler.running:
+            out = self.profiler.stop()
+            if out:
+                write_log(f"Профіль збережено: {out}")
+                QMessageBox.information(self, "Профілювання", f"Профіль збережено:\n{out}")
+        else:
+            self.profiler.start()
+        self.refresh()
+
+    def on_reset(self):
+        DIAG.reset()
+        self.refresh()
+
 # ---------------------------
 # UI MainWindow
 # ---------------------------
@@ -349,7 +1640,24 @@ class MainWindow(QtWidgets.QMainWindow):
         save_group_colors(self.group_colors)
 
         self.monitor_thread: Optional[MonitorThread] = None
-        self.status_map: Dict[str, bool] = {}
+        self.registry = HostRegistry()
+        # host id -> (група, статус, пінг) комірки кожного рядка цього хоста
+        self._row_items: Dict[int, List[Tuple[str, QtWidgets.QTableWidgetItem, QtWidgets.QTableWidgetItem]]] = {}
+        # останній показаний стан хоста; потрібен для переходів у лічильниках груп
+        self._host_state: Dict[int, Tuple[str, Optional[int]]] = {}
+        self.group_stats: Dict[str, GroupStats] = {}
+        self._groups_dirty: set = set()
+        self._collapsed: set = set(self.cfg.get("collapsed_groups", []))
+        self.probe = ping_host  # підміняється у benchmark.py
+        self.profiler = SamplingProfiler()
+        self.diag_dialog: Optional[DiagnosticsDialog] = None
+
+        self.exporter: Optional[MetricsExporter] = None
+        metrics_port = int(self.cfg.get("metrics_port", 0) or 0)
+        if metrics_port > 0:
+            self.exporter = MetricsExporter(self.cfg.get("metrics_host", "127.0.0.1"), metrics_port)
+            if not self.exporter.start():
+                self.exporter = None
 
         # theme state
         self.current_theme = "dark"  # default restored style
@@ -358,11 +1666,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self._load_entries_into_table()
 
         # prepare thread object
-        interval = self.cfg.get("ping_interval", 5)
-        timeout = self.cfg.get("ping_timeout", 1)
-        self.monitor_thread = MonitorThread(self._get_entries, interval_sec=interval, timeout_s=timeout)
-        self.monitor_thread.updated.connect(self._on_update_from_thread)
-        self.monitor_thread.log.connect(self._append_log)
+        self.monitor_thread = self._create_monitor_thread()
 
         self.apply_dark_theme()
         QtCore.QTimer.singleShot(1200, self.auto_update_check)
@@ -396,10 +1700,13 @@ class MainWindow(QtWidgets.QMainWindow):
         self.input_ip.setFixedWidth(320)
         self.input_note = QtWidgets.QLineEdit(); self.input_note.setPlaceholderText("Примітка")
         self.input_note.setFixedWidth(300)
+        self.input_parent = QtWidgets.QLineEdit(); self.input_parent.setPlaceholderText("Батьківський IP (необов'язково)")
+        self.input_parent.setFixedWidth(220)
 
         top_h.addWidget(self.combo_group)
         top_h.addWidget(self.input_ip)
         top_h.addWidget(self.input_note)
+        top_h.addWidget(self.input_parent)
 
         top_h.addStretch()
 
@@ -440,9 +1747,32 @@ class MainWindow(QtWidgets.QMainWindow):
         self.table.setColumnWidth(3,120)
         self.table.setColumnWidth(4,100)
 
-        # Splitter: top = table, bottom = controls+log
+        # Group summary (left of table): live counts, click to collapse/expand
+        self.group_tree = QtWidgets.QTreeWidget()
+        self.group_tree.setColumnCount(6)
+        self.group_tree.setHeaderLabels(["Група", "Всього", "🟢", "🔴", "❔", "Макс. ms"])
+        self.group_tree.headerItem().setToolTip(4, "Невідомо / недосяжні / обслуговування")
+        self.group_tree.setRootIsDecorated(False)
+        self.group_tree.setUniformRowHeights(True)
+        self.group_tree.setColumnWidth(0, 150)
+        for c in range(1, 6):
+            self.group_tree.setColumnWidth(c, 58)
+        self.group_tree.setToolTip("Клік по групі — згорнути/розгорнути її рядки в таблиці")
+        self.group_tree.itemClicked.connect(self.on_group_clicked)
+        self._group_items: Dict[str, QtWidgets.QTreeWidgetItem] = {}
+
+        self.top_splitter = QtWidgets.QSplitter(QtCore.Qt.Orientation.Horizontal)
+        self.top_splitter.addWidget(self.group_tree)
+        self.top_splitter.addWidget(self.table)
+        self.top_splitter.setSizes([360, 900])
+
+        self.group_timer = QtCore.QTimer(self)
+        self.group_timer.timeout.connect(self._refresh_group_panel)
+        self.group_timer.start(500)
+
+        # Splitter: top = groups+table, bottom = controls+log
         self.splitter = QtWidgets.QSplitter(QtCore.Qt.Orientation.Vertical)
-        self.splitter.addWidget(self.table)
+        self.splitter.addWidget(self.top_splitter)
 
         # Bottom widget contains buttons row + log (we'll allow resizing)
         bottom_widget = QtWidgets.QWidget()
@@ -457,20 +1787,24 @@ class MainWindow(QtWidgets.QMainWindow):
         self.btn_start = QtWidgets.QPushButton("Запустити моніторинг")
         self.btn_stop = QtWidgets.QPushButton("Зупинити")
         self.btn_clear_log = QtWidgets.QPushButton("Очистити лог")
+        self.btn_diag = QtWidgets.QPushButton("Діагностика")
 
         self.btn_start.setObjectName("start")
         self.btn_stop.setObjectName("stop")
         self.btn_clear_log.setObjectName("clear")
+        self.btn_diag.setObjectName("diag")
 
         self.btn_start.clicked.connect(self.start_monitoring)
         self.btn_stop.clicked.connect(self.stop_monitoring)
         self.btn_clear_log.clicked.connect(self.clear_log)
+        self.btn_diag.clicked.connect(self.show_diagnostics)
 
         self.btn_stop.setEnabled(False)
 
         btn_row.addWidget(self.btn_start)
         btn_row.addWidget(self.btn_stop)
         btn_row.addWidget(self.btn_clear_log)
+        btn_row.addWidget(self.btn_diag)
         btn_row.addStretch()
 
         self.label_status = QtWidgets.QLabel("Статус: зупинено")
@@ -500,12 +1834,15 @@ class MainWindow(QtWidgets.QMainWindow):
     # ---------------------------
     # Table helpers
     # ---------------------------
-    def _add_table_row(self, group: str, ip: str, note: str, status: str = "UNKNOWN", ping_ms: Optional[int]=None):
+    def _add_table_row(self, group: str, ip: str, note: str, status: str = "UNKNOWN", ping_ms: Optional[int]=None,
+                       parent: str = ""):
         r = self.table.rowCount()
         self.table.insertRow(r)
 
         item_group = QtWidgets.QTableWidgetItem(group)
         item_ip = QtWidgets.QTableWidgetItem(ip)
+        if parent:
+            item_ip.setToolTip(f"Батьківський вузол: {parent}")
         item_note = QtWidgets.QTableWidgetItem(note)
         item_status = QtWidgets.QTableWidgetItem(status)
         item_ping = QtWidgets.QTableWidgetItem(str(ping_ms) if ping_ms is not None else "-")
@@ -529,23 +1866,47 @@ class MainWindow(QtWidgets.QMainWindow):
         self.table.setItem(r,3,item_status)
         self.table.setItem(r,4,item_ping)
 
-    def _find_row_by_ip(self, ip: str) -> Optional[int]:
+        if group in self._collapsed:
+            self.table.setRowHidden(r, True)
+        hid = self.registry.id_of(ip)
+        if hid is not None:
+            self._register_row(hid, group, item_status, item_ping)
+
+    def _register_row(self, hid: int, group: str, item_status, item_ping):
+        self._row_items.setdefault(hid, []).append((group, item_status, item_ping))
+        state, rtt = self._host_state.get(hid, ("UNKNOWN", None))
+        self.group_stats.setdefault(group, GroupStats()).add(hid, state, rtt)
+        if hid in self._host_state and group not in self._collapsed:
+            self._render_cells(item_status, item_ping, state, rtt)
+        self._groups_dirty.add(group)
+
+    def _reindex_rows(self):
+        # структурна зміна (видалення рядків): лічильники груп будуються заново
+        self._row_items = {}
+        self.group_stats = {}
+        self._host_state = {hid: st for hid, st in self._host_state.items() if self.registry.records[hid] is not None}
         for r in range(self.table.rowCount()):
             it = self.table.item(r,1)
-            if it and it.text() == ip:
-                return r
-        return None
+            hid = self.registry.id_of(it.text()) if it else None
+            if hid is not None:
+                group_item = self.table.item(r,0)
+                self._register_row(hid, group_item.text() if group_item else "", self.table.item(r,3), self.table.item(r,4))
+        self._groups_dirty.update(self._group_items)
+
+    def _sync_registry(self):
+        self.registry.sync(self.cfg.get("entries", []), self.cfg.get("maintenance", []))
 
     def _load_entries_into_table(self):
         self.table.setRowCount(0)
+        self._row_items = {}
+        self.group_stats = {}
+        self._groups_dirty.update(self._group_items)
+        self._sync_registry()
         for e in self.cfg.get("entries", []):
             group = e.get("group","")
             ip = e.get("ip","")
             note = e.get("note","")
-            self._add_table_row(group, ip, note, status="UNKNOWN", ping_ms=None)
-
-    def _get_entries(self):
-        return list(self.cfg.get("entries", []))
+            self._add_table_row(group, ip, note, status="UNKNOWN", ping_ms=None, parent=e.get("parent",""))
 
     # ---------------------------
     # Actions
@@ -554,6 +1915,7 @@ class MainWindow(QtWidgets.QMainWindow):
         group = self.combo_group.currentText().strip()
         ip = self.input_ip.text().strip()
         note = self.input_note.text().strip()
+        parent = self.input_parent.text().strip()
         if not ip:
             return
         existing = [x for x in self.cfg.setdefault("entries", []) if x.get("ip")==ip and x.get("group")==group]
@@ -564,9 +1926,12 @@ class MainWindow(QtWidgets.QMainWindow):
             return
 
         entry = {"group": group, "ip": ip, "note": note}
+        if parent and parent != ip:
+            entry["parent"] = parent
         self.cfg["entries"].append(entry)
         save_config(self.cfg)
-        self._add_table_row(group, ip, note, status="UNKNOWN", ping_ms=None)
+        self._sync_registry()
+        self._add_table_row(group, ip, note, status="UNKNOWN", ping_ms=None, parent=entry.get("parent", ""))
         if group not in self.group_colors:
             self.group_colors[group] = DEFAULT_GROUP_COLORS.get(group, "#DDDDDD")
             save_group_colors(self.group_colors)
@@ -576,6 +1941,7 @@ class MainWindow(QtWidgets.QMainWindow):
         send_telegram_async(msg)
         self.input_ip.clear()
         self.input_note.clear()
+        self.input_parent.clear()
 
     def on_delete_selected(self):
         rows = sorted([idx.row() for idx in self.table.selectionModel().selectedRows()], reverse=True)
@@ -592,17 +1958,23 @@ class MainWindow(QtWidgets.QMainWindow):
             self.table.removeRow(r)
             write_log(f"Видалено {ip} ({note}) з групи {group}")
             self._append_log(f"Видалено {ip} ({note}) з групи {group}")
-            self.status_map.pop(ip, None)
-            if self.monitor_thread and ip in self.monitor_thread.last_state:
-                self.monitor_thread.last_state.pop(ip, None)
         save_config(self.cfg)
+        self._sync_registry()
+        self._reindex_rows()
 
     # ---------------------------
     # Search/filter
     # ---------------------------
     def on_search_changed(self, text: str):
-        t = text.lower().strip()
+        self._apply_row_visibility()
+
+    def _apply_row_visibility(self):
+        t = self.search_input.text().lower().strip()
         for r in range(self.table.rowCount()):
+            group_item = self.table.item(r,0)
+            if group_item and group_item.text() in self._collapsed:
+                self.table.setRowHidden(r, True)
+                continue
             visible = False
             for c in range(self.table.columnCount()):
                 it = self.table.item(r,c)
@@ -611,6 +1983,67 @@ class MainWindow(QtWidgets.QMainWindow):
                     break
             self.table.setRowHidden(r, not visible)
 
+    # ---------------------------
+    # Group panel
+    # ---------------------------
+    def on_group_clicked(self, item: QtWidgets.QTreeWidgetItem, column: int):
+        group = item.data(0, QtCore.Qt.ItemDataRole.UserRole)
+        if group in self._collapsed:
+            self._collapsed.discard(group)
+            self._render_group_rows(group)
+        else:
+            self._collapsed.add(group)
+        self.cfg["collapsed_groups"] = sorted(self._collapsed)
+        save_config(self.cfg)
+        self._apply_row_visibility()
+        self._groups_dirty.add(group)
+        self._refresh_group_panel()
+
+    def _render_group_rows(self, group: str):
+        # поки група згорнута, комірки не оновлюються — дотягуємо останній стан
+        for hid, items in self._row_items.items():
+            state, rtt = self._host_state.get(hid, ("UNKNOWN", None))
+            for g, item_status, item_ping in items:
+                if g == group:
+                    self._render_cells(item_status, item_ping, state, rtt)
+
+    def _refresh_group_panel(self):
+        if not self._groups_dirty:
+            return
+        dirty, self._groups_dirty = self._groups_dirty, set()
+        for group in dirty:
+            stats = self.group_stats.get(group)
+            item = self._group_items.get(group)
+            if stats is None or not stats.total:
+                if item is not None:
+                    self.group_tree.takeTopLevelItem(self.group_tree.indexOfTopLevelItem(item))
+                    del self._group_items[group]
+                continue
+            if item is None:
+                item = QtWidgets.QTreeWidgetItem()
+                item.setData(0, QtCore.Qt.ItemDataRole.UserRole, group)
+                try:
+                    bg = QtGui.QColor(self.group_colors.get(group, "#dddddd"))
+                    item.setBackground(0, QtGui.QBrush(bg))
+                    brightness = bg.red()*0.299 + bg.green()*0.587 + bg.blue()*0.114
+                    item.setForeground(0, QtGui.QBrush(QtGui.QColor("#000000") if brightness > 160 else QtGui.QColor("#ffffff")))
+                except Exception:
+                    pass
+                for c in range(1, 6):
+                    item.setTextAlignment(c, QtCore.Qt.AlignmentFlag.AlignCenter)
+                self._group_items[group] = item
+                self.group_tree.addTopLevelItem(item)
+                self.group_tree.sortItems(0, QtCore.Qt.SortOrder.AscendingOrder)
+            c = stats.counts
+            worst = stats.worst_rtt()
+            item.setText(0, f"{'▶' if group in self._collapsed else '▼'} {group or 'Без групи'}")
+            item.setText(1, str(stats.total))
+            item.setText(2, str(c["ONLINE"]))
+            item.setText(3, str(c["OFFLINE"]))
+            item.setText(4, str(c["UNKNOWN"] + c["UNREACHABLE"] + c["MAINTENANCE"]))
+            item.setText(5, str(worst) if worst is not None else "-")
+            item.setForeground(3, QtGui.QBrush(QtGui.QColor("#f39c12" if c["OFFLINE"] else "#9e9e9e")))
+
     # ---------------------------
     # Monitoring control
     # ---------------------------
@@ -619,24 +2052,49 @@ class MainWindow(QtWidgets.QMainWindow):
             QMessageBox.warning(self, "Увага", "Додайте хоча б один IP для моніторингу")
             return
 
-        interval = self.cfg.get("ping_interval", 5)
         timeout = self.cfg.get("ping_timeout", 1)
-        self.monitor_thread = MonitorThread(self._get_entries, interval_sec=interval, timeout_s=timeout)
-        self.monitor_thread.updated.connect(self._on_update_from_thread)
-        self.monitor_thread.log.connect(self._append_log)
+        self.monitor_thread = self._create_monitor_thread()
+
+        if isinstance(self.monitor_thread, ShardedMonitorThread):
+            # великі інвентарі: без послідовного стартового пінгу та повідомлень для кожного вузла,
+            # початковий стан дає перший прохід воркерів
+            n = len(self.cfg.get("entries", []))
+            send_telegram_async(f"📡 Моніторинг запущено: {n} вузлів, {self.monitor_thread.workers} процесів")
+            self._append_log(f"Моніторинг запущено ({n} вузлів, {self.monitor_thread.workers} процесів)")
+        else:
+            send_telegram_async("📡 Моніторинг запущено")
+            self._append_log("Моніторинг запущено")
+            self._probe_all_on_start(timeout)
 
-        send_telegram_async("📡 Моніторинг запущено")
-        self._append_log("Моніторинг запущено")
+        self.monitor_thread.start()
+        self.btn_start.setEnabled(False)
+        self.btn_stop.setEnabled(True)
+        self.label_status.setText("Статус: моніторинг запущено")
+        write_log("Моніторинг запущено")
 
-        for e in self.cfg.get("entries", []):
-            ip = e.get("ip")
-            group = e.get("group","")
-            note = e.get("note","")
+    def _probe_all_on_start(self, timeout: float):
+        # батьківські вузли перевіряються першими; вузли за недоступним батьком не пінгуються
+        topo = self.registry.topology()
+        records = self.registry.records
+        self.registry.maintenance.advance()
+        blocked: set = set()
+        for hid in topo.order:
+            rec = records[hid]
+            ip, group, note = rec.ip, rec.group, rec.note
+            if topo.is_blocked(hid, blocked, records):
+                blocked.add(hid)
+                self.registry.set_unreachable(hid)
+                self._on_update_row(hid, "UNREACHABLE", None)
+                continue
+            if rec.maintenance is not None:
+                # вузли на обслуговуванні не пінгуються і не дають повідомлень на старті
+                self._on_update_row(hid, "MAINTENANCE", None)
+                continue
             try:
-                ok, rtt, used = ping_host(ip, timeout_s=timeout)
+                ok, rtt, used = self.monitor_thread.probe(ip, timeout_s=timeout)
             except Exception:
                 ok, rtt, used = False, None, None
-            self.monitor_thread.last_state[ip] = ok
+            self.registry.record_probe(hid, ok, rtt)
             status_emoji = "🟢" if ok else "🔴"
             msg = (
                 f"{status_emoji} Почато моніторинг:\n"
@@ -647,14 +2105,25 @@ class MainWindow(QtWidgets.QMainWindow):
             )
             if ok and rtt is not None:
                 msg += f" ({rtt} ms)"
+            if not ok and topo.descendants.get(hid, 0):
+                msg += f"\nНедосяжних залежних вузлів: {topo.descendants[hid]}"
             send_telegram_async(msg)
-            self._on_update_table_row(ip, "ONLINE" if ok else "OFFLINE", rtt)
+            self._on_update_row(hid, "ONLINE" if ok else "OFFLINE", rtt)
 
-        self.monitor_thread.start()
-        self.btn_start.setEnabled(False)
-        self.btn_stop.setEnabled(True)
-        self.label_status.setText("Статус: моніторинг запущено")
-        write_log("Моніторинг запущено")
+    def _create_monitor_thread(self) -> MonitorThread:
+        interval = self.cfg.get("ping_interval", 5)
+        timeout = self.cfg.get("ping_timeout", 1)
+        on_sweep = self.exporter.publish if self.exporter else None
+        kwargs = dict(interval_sec=interval, timeout_s=timeout, on_sweep=on_sweep,
+                      probe=self.probe, probe_pause_s=self.cfg.get("probe_pause", 0.06))
+        workers = int(self.cfg.get("worker_processes", 0) or 0)
+        if workers > 1:
+            thread = ShardedMonitorThread(self.registry, workers=workers, **kwargs)
+        else:
+            thread = MonitorThread(self.registry, **kwargs)
+        thread.updated.connect(self._on_update_from_thread)
+        thread.log.connect(self._append_log)
+        return thread
 
     def stop_monitoring(self):
         if self.monitor_thread and self.monitor_thread.isRunning():
@@ -668,26 +2137,58 @@ class MainWindow(QtWidgets.QMainWindow):
     # ---------------------------
     # Update from thread
     # ---------------------------
-    def _on_update_from_thread(self, ip: str, state: str, rtt):
-        self._on_update_table_row(ip, state, rtt)
-
-    def _on_update_table_row(self, ip: str, state: str, rtt):
-        r = self._find_row_by_ip(ip)
-        if r is None:
-            group = self.combo_group.currentText() if self.combo_group.currentText() else "Без групи"
-            note = ""
-            self.cfg.setdefault("entries", []).append({"group": group, "ip": ip, "note": note})
-            save_config(self.cfg)
-            self._add_table_row(group, ip, note, status=state, ping_ms=rtt)
+    def _on_update_from_thread(self, hid: int, state: str, rtt):
+        sender = self.sender()
+        if isinstance(sender, MonitorThread):
+            sender.ack_update()
+        start = time.perf_counter()
+        self._on_update_row(hid, state, rtt)
+        DIAG.record("gui_update_ms", (time.perf_counter() - start) * 1000)
+        DIAG.count("gui_updates")
+
+    def _on_update_row(self, hid: int, state: str, rtt):
+        items = self._row_items.get(hid)
+        if not items:
             return
-        status_text = "🟢 ONLINE" if state == "ONLINE" else "🔴 OFFLINE"
-        self.table.item(r,3).setText(status_text)
-        self.table.item(r,4).setText(str(rtt) if rtt is not None else "-")
+        old_state, _ = self._host_state.get(hid, ("UNKNOWN", None))
+        self._host_state[hid] = (state, rtt)
+        for group, item_status, item_ping in items:
+            self.group_stats[group].move(hid, old_state, state, rtt)
+            self._groups_dirty.add(group)
+            if group not in self._collapsed:
+                self._render_cells(item_status, item_ping, state, rtt)
+
+    def _render_cells(self, item_status, item_ping, state: str, rtt):
         if state == "ONLINE":
-            self.table.item(r,3).setForeground(QtGui.QBrush(QtGui.QColor("#00c853")))
+            status_text, color = "🟢 ONLINE", "#00c853"
+        elif state == "UNREACHABLE":
+            status_text, color = "⚪ НЕДОСЯЖНИЙ", "#9e9e9e"
+        elif state == "MAINTENANCE":
+            status_text, color = "🌙 ОБСЛУГОВУВАННЯ", "#9575cd"
+        elif state == "UNKNOWN":
+            status_text, color = "UNKNOWN", "#9e9e9e"
         else:
-            self.table.item(r,3).setForeground(QtGui.QBrush(QtGui.QColor("#f39c12")))
-        self.status_map[ip] = (state == "ONLINE")
+            status_text, color = "🔴 OFFLINE", "#f39c12"
+        item_status.setText(status_text)
+        item_status.setForeground(QtGui.QBrush(QtGui.QColor(color)))
+        item_ping.setText(str(rtt) if rtt is not None else "-")
+
+    # ---------------------------
+    # Diagnostics
+    # ---------------------------
+    def show_diagnostics(self):
+        if self.diag_dialog is None:
+            self.diag_dialog = DiagnosticsDialog(self.profiler, self)
+        self.diag_dialog.show()
+        self.diag_dialog.raise_()
+        self.diag_dialog.activateWindow()
+
+    def closeEvent(self, event):
+        # звільнити порт метрик одразу, а не після завершення процесу
+        if self.exporter is not None:
+            self.exporter.stop()
+            self.exporter = None
+        super().closeEvent(event)
 
     # ---------------------------
     # Log UI
@@ -727,6 +2228,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.setStyleSheet(f"""
             QWidget {{ background-color: #2e2f31; color: #e6e6e6; font-family: 'Segoe UI'; font-size: 11pt; }}
             QTableWidget {{ background-color: #323435; color: #e6e6e6; gridline-color: #3b3b3b; }}
+            QTreeWidget {{ background-color: #323435; color: #e6e6e6; border:1px solid #3b3b3b; }}
             QHeaderView::section {{ background-color: #2f3032; color: #cfcfcf; padding:6px; border:1px solid #3b3b3b; }}
             QLabel#app_label {{ font-size: 12pt; color: #f0f0f0; }}
             QLineEdit {{ background-color: #2f3032; color: #e6e6e6; border:1px solid #3b3b3b; padding:6px; border-radius:6px; }}
@@ -746,7 +2248,7 @@ class MainWindow(QtWidgets.QMainWindow):
             QToolButton {{ background: transparent; border: none; padding:2px; }}
         """)
         # ensure text in buttons stays white on hover by style
-        for btn in [self.btn_start, self.btn_stop, self.btn_clear_log, self.btn_add, self.btn_delete]:
+        for btn in [self.btn_start, self.btn_stop, self.btn_clear_log, self.btn_diag, self.btn_add, self.btn_delete]:
             btn.setStyleSheet("QPushButton { color: #e6e6e6; } QPushButton:hover { color: #ffffff; }")
 
     def apply_light_theme(self):
@@ -756,6 +2258,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.setStyleSheet(f"""
             QWidget {{ background-color: #f6f8f7; color: #071312; font-family: 'Segoe UI'; font-size: 11pt; }}
             QTableWidget {{ background-color: #ffffff; color: #071312; gridline-color: #ddd; }}
+            QTreeWidget {{ background-color: #ffffff; color: #071312; border:1px solid #ddd; }}
             QHeaderView::section {{ background-color: #eef6ee; color: #1f6a1f; padding:6px; border:1px solid #ddd; }}
             QLabel#app_label {{ font-size: 12pt; color: #071312; }}
             QLineEdit {{ background-color: #ffffff; color: #071312; border:1px solid #ddd; padding:6px; border-radius:6px; }}
@@ -774,7 +2277,7 @@ class MainWindow(QtWidgets.QMainWindow):
             QPushButton#delete:hover {{ border-color: {HOVER_RED}; color: #000000; }}
             QToolButton {{ background: transparent; border: none; padding:2px; }}
         """)
-        for btn in [self.btn_start, self.btn_stop, self.btn_clear_log, self.btn_add, self.btn_delete]:
+        for btn in [self.btn_start, self.btn_stop, self.btn_clear_log, self.btn_diag, self.btn_add, self.btn_delete]:
             btn.setStyleSheet("QPushButton { color: inherit; } QPushButton:hover { color: inherit; }")
 
     # ---------------------------
@@ -845,4 +2348,5 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+benchmark.py — відтворюваний бенчмарк конвеєра моніторингу PingMonitor
+- симульована мережа (fake ping_host) або loopback-адреси 127.x.y.z (реальний ping)
+- затримка, втрати та «флапи» хостів задаються параметрами, все детерміновано через --seed
+- заглушка Telegram API (локальний HTTP) рахує надіслані сповіщення
+- MainWindow у offscreen Qt: вимірюються час проходу, CPU (разом з дочірніми процесами),
+  RSS (окремо для воркерів), пропускна здатність GUI
+- результат у JSON (--out), порівняння з попереднім запуском (--compare)
+
+Приклади:
+    python benchmark.py --hosts 100,1000 --sweeps 3
+    python benchmark.py --hosts 10000 --sweeps 1 --out new.json --compare old.json
+    python benchmark.py --backend loopback --hosts 100
+"""
+
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import zlib
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+# PingMonitor пише конфіг/лог у APP_DIR — ізолюємо бенчмарк у тимчасовому каталозі
+_BENCH_HOME = tempfile.mkdtemp(prefix="pingmonitor-bench-")
+os.environ["APPDATA"] = _BENCH_HOME
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+sys.path.insert(0, str(Path(__file__).parent))
+import PingMonitor as pm  # noqa: E402
+
+from PyQt6 import QtWidgets  # noqa: E402
+
+# ---------------------------
+# Заглушка Telegram / update-сервера
+# ---------------------------
+class StubServer:
+    """Локальний HTTP: POST /bot*/sendMessage -> 200 (рахується), решта -> 404."""
+
+    def __init__(self):
+        self.messages = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                if self.path.endswith("/sendMessage"):
+                    with stub._lock:
+                        stub.messages += 1
+                    body = b'{"ok":true}'
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                else:
+                    self.send_error(404)
+
+            def do_GET(self):
+                self.send_error(404)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+# ---------------------------
+# Симульована мережа
+# ---------------------------
+class FakeNetwork:
+    """Детермінована мережа: у кожного хоста своя затримка, втрати та графік флапів.
+
+    Флап: хост недоступний flap_len проб із кожних flap_period (фаза залежить від IP).
+    """
+
+    def __init__(self, seed: int, latency_ms: float, jitter_ms: float, loss: float,
+                 flap_ratio: float, flap_period: int, flap_len: int, fail_ms: float):
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.loss = loss
+        self.flap_ratio = flap_ratio
+        self.flap_period = max(1, flap_period)
+        self.flap_len = flap_len
+        self.fail_ms = fail_ms
+        self._hosts: Dict[str, Tuple[random.Random, bool, int]] = {}
+        self._probes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # воркери шардів отримують мережу через pickle (spawn у Windows/macOS); lock не серіалізується
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _host(self, addr: str) -> Tuple[random.Random, bool, int]:
+        h = self._hosts.get(addr)
+        if h is None:
+            seed = self.seed ^ zlib.crc32(addr.encode())
+            rng = random.Random(seed)
+            flapping = rng.random() < self.flap_ratio
+            phase = rng.randrange(self.flap_period)
+            h = self._hosts[addr] = (rng, flapping, phase)
+        return h
+
+    def probe(self, addr: str, timeout_s: float = 1.0) -> Tuple[bool, Optional[int], Optional[str]]:
+        with self._lock:
+            rng, flapping, phase = self._host(addr)
+            n = self._probes.get(addr, 0)
+            self._probes[addr] = n + 1
+            down = flapping and (n + phase) % self.flap_period < self.flap_len
+            lost = down or rng.random() < self.loss
+            delay = self.latency_ms + rng.uniform(0, self.jitter_ms)
+        if lost:
+            time.sleep(self.fail_ms / 1000.0)
+            return False, None, None
+        time.sleep(delay / 1000.0)
+        return True, int(delay), addr
+
+def loopback_address(i: int) -> str:
+    # у Linux на lo відповідає вся мережа 127.0.0.0/8
+    return f"127.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+
+def make_entries(n: int, backend: str, branch_size: int) -> List[Dict]:
+    groups = pm.DEFAULT_GROUPS
+    entries = []
+    for i in range(n):
+        ip = loopback_address(i + 1) if backend == "loopback" else f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+        e = {"group": groups[i % len(groups)], "ip": ip, "note": f"bench-{i}"}
+        if branch_size > 1 and i % branch_size:
+            e["parent"] = entries[i - i % branch_size]["ip"]
+        entries.append(e)
+    return entries
+
+# ---------------------------
+# Вимірювання
+# ---------------------------
+def rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / 1048576
+    except Exception:
+        pass
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1048576
+    except Exception:
+        return None
+
+def children_cpu_s() -> float:
+    """CPU завершених дочірніх процесів (воркери шардів, ping); 0 там, де немає resource."""
+    try:
+        import resource
+        ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return ru.ru_utime + ru.ru_stime
+    except Exception:
+        return 0.0
+
+def workers_rss_mb(thread) -> float:
+    """Сумарний RSS живих процесів-воркерів (0 в однопотоковому режимі)."""
+    total = 0.0
+    for proc in getattr(thread, "_procs", []):
+        if proc is not None and proc.is_alive():
+            total += rss_mb(proc.pid) or 0.0
+    return total
+
+def wait_until(app: QtWidgets.QApplication, cond, timeout_s: float) -> bool:
+    deadline = time.perf_counter() + timeout_s
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        if cond():
+            return True
+        time.sleep(0.001)
+    return False
+
+def run_tier(app: QtWidgets.QApplication, stub: StubServer, n: int, args) -> Dict:
+    pm.DIAG.reset()
+    entries = make_entries(n, args.backend, args.branch_size)
+    pm.save_config({"entries": entries, "ping_interval": args.interval, "ping_timeout": args.timeout,
+                    "probe_pause": args.probe_pause, "worker_processes": args.workers})
+    if args.backend == "fake":
+        net = FakeNetwork(args.seed, args.latency_ms, args.jitter_ms, args.loss,
+                          args.flap_ratio, args.flap_period, args.flap_len, args.fail_ms)
+        probe = net.probe
+    else:
+        probe = pm.ping_host
+
+    rss_before = rss_mb()
+    cpu0 = time.process_time()
+    child_cpu0 = children_cpu_s()
+    t0 = time.perf_counter()
+    win = pm.MainWindow()
+    win.probe = probe
+    build_s = time.perf_counter() - t0
+
+    msgs0 = stub.messages
+    t1 = time.perf_counter()
+    win.start_monitoring()
+    startup_s = time.perf_counter() - t1
+
+    thread = win.monitor_thread
+    t2 = time.perf_counter()
+    finished = wait_until(app, lambda: thread.sweeps >= args.sweeps, args.max_seconds)
+    run_s = time.perf_counter() - t2
+    # RSS воркерів знімається до зупинки; їхній CPU — після join у stop_monitoring
+    workers_rss = workers_rss_mb(thread)
+    win.stop_monitoring()
+    wait_until(app, lambda: thread.pending_updates == 0, 10)
+    # дочекатися асинхронних надсилань у заглушку
+    wait_until(app, lambda: pm.telegram_queue_depth() == 0, 30)
+    cpu_main_s = time.process_time() - cpu0
+    cpu_children_s = children_cpu_s() - child_cpu0
+
+    diag = pm.DIAG.summary()
+    counters = diag["counters"]
+    result = {
+        "hosts": n,
+        "sweeps": thread.sweeps,
+        "completed": finished,
+        "window_build_s": round(build_s, 4),
+        "startup_s": round(startup_s, 4),
+        "run_s": round(run_s, 4),
+        "cpu_s": round(cpu_main_s + cpu_children_s, 4),
+        "cpu_main_s": round(cpu_main_s, 4),
+        "cpu_children_s": round(cpu_children_s, 4),
+        "rss_mb": round(rss_mb() or 0, 1),
+        "workers_rss_mb": round(workers_rss, 1),
+        "rss_delta_mb": round((rss_mb() or 0) - (rss_before or 0), 1),
+        "sweep_ms": diag["histograms"]["sweep_duration_ms"],
+        "probe_latency_ms": diag["histograms"]["probe_latency_ms"],
+        "schedule_lag_ms": diag["histograms"]["schedule_lag_ms"],
+        "gui_update_ms": diag["histograms"]["gui_update_ms"],
+        "signal_queue_depth": diag["histograms"]["signal_queue_depth"],
+        "gui_updates": counters.get("gui_updates", 0),
+        "gui_updates_per_s": round(counters.get("gui_updates", 0) / run_s, 1) if run_s else 0.0,
+        "probes": counters.get("probes", 0),
+        "probe_failures": counters.get("probe_failures", 0),
+        "telegram_messages": stub.messages - msgs0,
+    }
+    win.close()
+    win.deleteLater()
+    app.processEvents()
+    return result
+
+# ---------------------------
+# Звіт
+# ---------------------------
+COMPARE_KEYS = [
+    ("sweep p50, ms", lambda r: r["sweep_ms"]["p50"]),
+    ("startup, s", lambda r: r["startup_s"]),
+    ("cpu, s", lambda r: r["cpu_s"]),
+    ("  дочірні, s", lambda r: r.get("cpu_children_s", 0)),
+    ("rss, MB", lambda r: r["rss_mb"]),
+    ("rss воркерів, MB", lambda r: r.get("workers_rss_mb", 0)),
+    ("gui upd/s", lambda r: r["gui_updates_per_s"]),
+    ("telegram", lambda r: r["telegram_messages"]),
+]
+
+def print_results(results: List[Dict], baseline: Optional[Dict] = None):
+    base = {r["hosts"]: r for r in (baseline or {}).get("results", [])}
+    for r in results:
+        print(f"--- {r['hosts']} хостів, проходів: {r['sweeps']}{'' if r['completed'] else ' (таймаут)'}")
+        for label, get in COMPARE_KEYS:
+            line = f"  {label:<16} {get(r):>12}"
+            old = base.get(r["hosts"])
+            if old:
+                prev = get(old)
+                delta = (get(r) - prev) / prev * 100 if prev else 0.0
+                line += f"   було {prev:>12}  ({delta:+.1f}%)"
+            print(line)
+
+def git_revision() -> Optional[str]:
+    try:
+        res = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, timeout=5)
+        return res.stdout.strip() or None
+    except Exception:
+        return None
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Бенчмарк PingMonitor на симульованій мережі")
+    ap.add_argument("--hosts", default="100,1000,10000", help="розміри мережі через кому")
+    ap.add_argument("--sweeps", type=int, default=2, help="повних проходів MonitorThread на розмір")
+    ap.add_argument("--backend", choices=["fake", "loopback"], default="fake")
+    ap.add_argument("--latency-ms", type=float, default=1.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.5)
+    ap.add_argument("--loss", type=float, default=0.01, help="ймовірність втрати проби")
+    ap.add_argument("--fail-ms", type=float, default=5.0, help="тривалість невдалої проби")
+    ap.add_argument("--flap-ratio", type=float, default=0.02, help="частка хостів, що флапають")
+    ap.add_argument("--flap-period", type=int, default=4)
+    ap.add_argument("--flap-len", type=int, default=1)
+    ap.add_argument("--branch-size", type=int, default=0, help="хостів у гілці за одним батьком (0 — без топології)")
+    ap.add_argument("--workers", type=int, default=0, help="worker_processes (0/1 — один потік)")
+    ap.add_argument("--interval", type=float, default=0.0, help="ping_interval, с")
+    ap.add_argument("--timeout", type=float, default=1.0, help="ping_timeout, с")
+    ap.add_argument("--probe-pause", type=float, default=0.0, help="пауза між хостами (у застосунку 0.06)")
+    ap.add_argument("--max-seconds", type=float, default=1800.0, help="ліміт часу на один розмір")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default=None, help="JSON з результатами (типово bench-<версія>-<час>.json)")
+    ap.add_argument("--compare", default=None, help="попередній JSON для порівняння")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(x) for x in args.hosts.split(",") if x.strip()]
+
+    stub = StubServer()
+    pm.TELEGRAM_API_URL = stub.url
+    pm.UPDATE_JSON_URL = f"{stub.url}/version.json"
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    results = []
+    for n in sizes:
+        print(f"Бенчмарк: {n} хостів ({args.backend})...", flush=True)
+        results.append(run_tier(app, stub, n, args))
+    stub.stop()
+
+    report = {
+        "version": pm.CURRENT_VERSION,
+        "git": git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": vars(args),
+        "results": results,
+    }
+    out = Path(args.out or f"bench-{pm.CURRENT_VERSION}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    print(f"Результати: {out}")
+    shutil.rmtree(_BENCH_HOME, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()